@@ -7,12 +7,14 @@ import pypdf
 import docx
 import json
 from backend.utils.llm_service import LlamaModel
+from backend.utils.circuit_breaker import request_deadline
 
 converter_bp = Blueprint('converter', __name__)
 llm = LlamaModel()
 
 @converter_bp.route('/convert-file', methods=['POST'])
 def convert_file():
+    deadline = request_deadline()
     if 'file' not in request.files:
         return jsonify({"error": "No file provided"}), 400
     
@@ -76,9 +78,14 @@ def convert_file():
             
             extracted_text = llm.generate(
                 f"Perform OCR on this image and extract all text. Return ONLY the extracted text, no commentary.",
-                temperature=0.1
+                temperature=0.1,
+                deadline=deadline
             )
             
+            # OCR has no offline fallback, so fail fast instead of returning the error as text
+            if extracted_text.startswith("Error"):
+                return jsonify({"error": extracted_text}), 503
+            
             # Save extracted text to file
             output_path = os.path.join(temp_dir, 'extracted_text.txt')
             with open(output_path, 'w', encoding='utf-8') as f:
@@ -6,12 +6,14 @@ import os
 import tempfile
 import pypdf
 from backend.utils.llm_service import LlamaModel
+from backend.utils.circuit_breaker import request_deadline
 
 flashcard_bp = Blueprint('flashcard', __name__)
 llm = LlamaModel()
 
 @flashcard_bp.route('/generate-flashcards', methods=['POST'])
 def generate_flashcards():
+    deadline = request_deadline()
     try:
         # Check if file is in request
         if 'file' not in request.files and 'content' not in request.json:
@@ -49,7 +51,7 @@ def generate_flashcards():
                 filename = request.json.get('filename')
         
         # Generate flashcards using LLM
-        flashcards = generate_flashcards_with_llm(content, filename)
+        flashcards = generate_flashcards_with_llm(content, filename, deadline)
         
         return jsonify({
             "success": True,
@@ -60,7 +62,7 @@ def generate_flashcards():
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
-def generate_flashcards_with_llm(content, filename):
+def generate_flashcards_with_llm(content, filename, deadline=None):
     try:
         # Create prompt for flashcard generation
         prompt = f"""
@@ -90,7 +92,7 @@ def generate_flashcards_with_llm(content, filename):
         """
         
         # Generate flashcards using LLM
-        result = llm.generate(prompt)
+        result = llm.generate(prompt, deadline=deadline)
         print(f"LLM result for flashcards: {result[:200]}...")
         
         # Parse the response to get the JSON array
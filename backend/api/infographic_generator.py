@@ -7,12 +7,14 @@ from werkzeug.utils import secure_filename
 import pypdf
 import requests
 from backend.utils.llm_service import LlamaModel
+from backend.utils.circuit_breaker import request_deadline
 
 infographic_bp = Blueprint('infographic', __name__)
 llm = LlamaModel()
 
 @infographic_bp.route('/generate-infographic', methods=['POST'])
 def generate_infographic():
+    deadline = request_deadline()
     try:
         content = ""
         filename = "document"
@@ -68,7 +70,7 @@ def generate_infographic():
             return jsonify({"error": "No input provided (file, URL, or content)"}), 400
             
         # Generate infographic content using LLM
-        infographic_data = generate_infographic_with_llm(content, filename, custom_prompt)
+        infographic_data = generate_infographic_with_llm(content, filename, custom_prompt, deadline)
         
         return jsonify({
             "success": True,
@@ -79,7 +81,7 @@ def generate_infographic():
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
-def generate_infographic_with_llm(content, filename, custom_prompt=None):
+def generate_infographic_with_llm(content, filename, custom_prompt=None, deadline=None):
     try:
         # Default prompt for infographic generation
         default_prompt = f"""
@@ -138,7 +140,7 @@ def generate_infographic_with_llm(content, filename, custom_prompt=None):
         
         # Generate infographic data using LLM
         print("Sending prompt to LLM for infographic generation")
-        result = llm.generate(prompt)
+        result = llm.generate(prompt, deadline=deadline)
         print(f"LLM result for infographic: {result[:200]}...")
         
         # Parse the response to get the JSON
@@ -9,6 +9,7 @@ from backend.api.flashcard_generator import flashcard_bp
 from backend.api.file_converter import converter_bp
 from backend.api.infographic_generator import infographic_bp
 from backend.api.payment import payment_bp
+from backend.utils.profiling import RequestProfiler
 
 # Load environment variables
 load_dotenv()
@@ -23,6 +24,9 @@ app.register_blueprint(converter_bp, url_prefix='/api/converter')
 app.register_blueprint(infographic_bp, url_prefix='/api/infographic')
 app.register_blueprint(payment_bp, url_prefix='/api/payment')
 
+# Opt-in per-request profiling (admin header or sampling)
+RequestProfiler(app)
+
 @app.route('/api/health', methods=['GET'])
 def health_check():
     return jsonify({"status": "ok"})
@@ -0,0 +1,168 @@
+import os
+import threading
+import time
+from collections import deque
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+# Default time budget (seconds) for a single request that calls the LLM
+DEFAULT_REQUEST_DEADLINE = float(os.getenv('LLM_REQUEST_DEADLINE_SECONDS', '25'))
+
+
+class CircuitBreaker:
+    """
+    Rolling-window circuit breaker for an external backend.
+
+    The breaker opens once enough calls have been seen in the window and the
+    share of failed or slow calls crosses the threshold. While open, calls are
+    rejected immediately. After the cooldown a limited number of probe calls
+    are let through (half-open); a successful probe closes the breaker again,
+    a failed one re-opens it.
+    """
+
+    def __init__(self, name, window_size=20, min_calls=5, failure_threshold=0.5,
+                 slow_call_seconds=10.0, cooldown_seconds=30.0, half_open_probes=1):
+        self.name = name
+        self.window_size = window_size
+        self.min_calls = min_calls
+        self.failure_threshold = failure_threshold
+        self.slow_call_seconds = slow_call_seconds
+        self.cooldown_seconds = cooldown_seconds
+        self.half_open_probes = half_open_probes
+
+        self._lock = threading.Lock()
+        self._results = deque(maxlen=window_size)
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._probes_in_flight = 0
+
+    @property
+    def state(self):
+        with self._lock:
+            self._maybe_half_open()
+            return self._state
+
+    def allow_request(self):
+        """
+        Check whether a call to the backend may proceed
+
+        Returns:
+            bool: False if the breaker is open and the call should fail fast
+        """
+        with self._lock:
+            self._maybe_half_open()
+            if self._state == CLOSED:
+                return True
+            if self._state == HALF_OPEN and self._probes_in_flight < self.half_open_probes:
+                self._probes_in_flight += 1
+                return True
+            return False
+
+    def record_success(self, elapsed):
+        """
+        Record a completed call
+
+        Args:
+            elapsed (float): Call duration in seconds; slow calls count as failures
+        """
+        if elapsed >= self.slow_call_seconds:
+            self.record_failure()
+            return
+
+        with self._lock:
+            if self._state == HALF_OPEN:
+                print(f"Circuit breaker '{self.name}' closed after successful probe")
+                self._state = CLOSED
+                self._results.clear()
+                self._probes_in_flight = 0
+                return
+            self._results.append(True)
+
+    def release(self):
+        """Finish a call that says nothing about backend health (e.g. a client error)"""
+        with self._lock:
+            if self._state == HALF_OPEN and self._probes_in_flight > 0:
+                self._probes_in_flight -= 1
+
+    def record_failure(self):
+        """Record a failed (or too slow) call"""
+        with self._lock:
+            if self._state == HALF_OPEN:
+                self._trip()
+                return
+            self._results.append(False)
+            if len(self._results) < self.min_calls:
+                return
+            failures = self._results.count(False)
+            if failures / len(self._results) >= self.failure_threshold:
+                self._trip()
+
+    def _trip(self):
+        print(f"Circuit breaker '{self.name}' opened")
+        self._state = OPEN
+        self._opened_at = time.monotonic()
+        self._probes_in_flight = 0
+        self._results.clear()
+
+    def _maybe_half_open(self):
+        if self._state == OPEN and time.monotonic() - self._opened_at >= self.cooldown_seconds:
+            self._state = HALF_OPEN
+            self._probes_in_flight = 0
+
+
+def _slow_call_seconds():
+    # Healthy non-streaming completions can take most of the per-call timeout,
+    # so by default only calls close to the timeout count as slow
+    value = os.getenv('LLM_BREAKER_SLOW_CALL_SECONDS')
+    if value:
+        return float(value)
+    return 0.8 * float(os.getenv('LLM_TIMEOUT_SECONDS', '20'))
+
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(name):
+    """
+    Get the shared circuit breaker for a backend, creating it on first use
+
+    Thresholds are read from LLM_BREAKER_* environment variables. The slow-call
+    threshold defaults to 80% of LLM_TIMEOUT_SECONDS.
+
+    Args:
+        name (str): Backend name, e.g. "gemini"
+
+    Returns:
+        CircuitBreaker: The breaker shared by every caller of that backend
+    """
+    with _breakers_lock:
+        if name not in _breakers:
+            _breakers[name] = CircuitBreaker(
+                name,
+                window_size=int(os.getenv('LLM_BREAKER_WINDOW', '20')),
+                min_calls=int(os.getenv('LLM_BREAKER_MIN_CALLS', '5')),
+                failure_threshold=float(os.getenv('LLM_BREAKER_FAILURE_RATE', '0.5')),
+                slow_call_seconds=_slow_call_seconds(),
+                cooldown_seconds=float(os.getenv('LLM_BREAKER_COOLDOWN_SECONDS', '30')),
+            )
+        return _breakers[name]
+
+
+def request_deadline(budget=None):
+    """
+    Compute the absolute deadline for the current request
+
+    Args:
+        budget (float): Time budget in seconds, defaults to LLM_REQUEST_DEADLINE_SECONDS
+
+    Returns:
+        float: Deadline on the time.monotonic() clock
+    """
+    return time.monotonic() + (budget if budget is not None else DEFAULT_REQUEST_DEADLINE)
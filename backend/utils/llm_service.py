@@ -1,8 +1,10 @@
 
 import os
+import time
 import requests
 import json
 from dotenv import load_dotenv
+from backend.utils.circuit_breaker import get_breaker
 
 # Load environment variables
 load_dotenv()
@@ -15,8 +17,10 @@ class LlamaModel:
         self.headers = {
             "Content-Type": "application/json",
         }
+        self.timeout = float(os.getenv('LLM_TIMEOUT_SECONDS', '20'))
+        self.breaker = get_breaker("gemini")
 
-    def generate(self, prompt, max_tokens=2000, temperature=0.2):
+    def generate(self, prompt, max_tokens=2000, temperature=0.2, deadline=None):
         """
         Generate text using the Gemini model
         
@@ -24,10 +28,29 @@ class LlamaModel:
             prompt (str): The input prompt
             max_tokens (int): Maximum number of tokens to generate
             temperature (float): Sampling temperature
+            deadline (float): Absolute time.monotonic() deadline for the call.
+                The remaining budget is used as the connect and read timeout;
+                requests applies the read timeout per socket read, so a call can
+                overrun by at most one read timeout. Results that arrive after
+                the deadline are discarded.
             
         Returns:
             str: The generated text
         """
+        timeout = self.timeout
+        shortened = False
+        if deadline is not None:
+            timeout = min(timeout, deadline - time.monotonic())
+            if timeout <= 0:
+                print("LLM request skipped: request deadline exceeded")
+                return "Error: Request deadline exceeded"
+            shortened = timeout < self.timeout
+        
+        if not self.breaker.allow_request():
+            print(f"LLM request skipped: circuit breaker '{self.breaker.name}' is open")
+            return "Error: LLM service temporarily unavailable"
+        
+        start = time.monotonic()
         try:
             payload = {
                 "contents": [
@@ -49,14 +72,26 @@ class LlamaModel:
             # Add API key as a query parameter
             url = f"{self.api_url}?key={self.api_key}"
             
-            response = requests.post(url, headers=self.headers, json=payload)
+            response = requests.post(url, headers=self.headers, json=payload, timeout=(timeout, timeout))
+            elapsed = time.monotonic() - start
             
             if response.status_code != 200:
+                # Only server errors and rate limiting say anything about the backend;
+                # other 4xx are specific to this request
+                if response.status_code >= 500 or response.status_code == 429:
+                    self.breaker.record_failure()
+                else:
+                    self.breaker.release()
                 print(f"API request failed with status {response.status_code}")
                 print(f"Response: {response.text}")
                 return f"Error: API request failed with status {response.status_code}"
             
             result = response.json()
+            self.breaker.record_success(elapsed)
+            
+            if deadline is not None and time.monotonic() > deadline:
+                print("LLM response discarded: request deadline exceeded")
+                return "Error: Request deadline exceeded"
             
             # Extract the generated text from Gemini's response format
             if "candidates" in result and len(result["candidates"]) > 0:
@@ -69,6 +104,17 @@ class LlamaModel:
             print(f"Unexpected API response format: {result}")
             return "Error: Unexpected API response format"
                 
+        except requests.exceptions.Timeout as e:
+            # A timeout caused by this request's own short budget is not a backend
+            # failure unless the call was also slow by the breaker's standard
+            if shortened and time.monotonic() - start < self.breaker.slow_call_seconds:
+                self.breaker.release()
+            else:
+                self.breaker.record_failure()
+            print(f"LLM request timed out: {e}")
+            return f"Error generating text: {str(e)}"
+                
         except Exception as e:
+            self.breaker.record_failure()
             print(f"Error in LLM request: {e}")
             return f"Error generating text: {str(e)}"
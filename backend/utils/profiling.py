@@ -0,0 +1,292 @@
+import os
+import re
+import sys
+import hmac
+import json
+import time
+import uuid
+import random
+import cProfile
+import threading
+import tracemalloc
+from flask import g, request
+from dotenv import load_dotenv
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+# Load environment variables
+load_dotenv()
+
+PROFILE_HEADER = 'X-Profile-Request'
+REQUEST_ID_HEADER = 'X-Request-ID'
+PROFILE_STATUS_HEADER = 'X-Profile-Status'
+
+# Client-supplied request ids end up in file names, so only allow a safe subset
+_REQUEST_ID_RE = re.compile(r'[A-Za-z0-9_-]{1,64}')
+
+# Files written for each profile, by suffix
+PROFILE_SUFFIXES = ('.prof', '.json', '.peak-allocations.txt', '.live-allocations.txt')
+
+# tracemalloc is process-wide, so only one request is profiled at a time
+_profile_lock = threading.Lock()
+
+
+def _read_proc_status_kb(field):
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith(field + ':'):
+                    return int(line.split()[1])
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+
+def _reset_peak_rss():
+    # Linux only: writing "5" to clear_refs resets VmHWM, so the peak covers the
+    # process since the request started (including concurrent requests)
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+
+def _peak_rss_kb(peak_was_reset):
+    if peak_was_reset:
+        peak = _read_proc_status_kb('VmHWM')
+        if peak is not None:
+            return peak
+    if resource is not None:
+        # Falls back to the process lifetime peak; macOS reports bytes, Linux KB
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        if sys.platform == 'darwin':
+            peak //= 1024
+        return peak
+    return None
+
+
+class _PeakSampler(threading.Thread):
+    """
+    Background thread that snapshots tracemalloc each time traced memory
+    reaches a new high, so allocation sites near the peak are kept after the
+    request has freed its temporary objects.
+    """
+
+    def __init__(self, interval, min_growth):
+        super().__init__(name='profiling-peak-sampler', daemon=True)
+        self.interval = interval
+        self.min_growth = min_growth
+        self.snapshot = None
+        self.snapshot_bytes = 0
+        self._baseline, _ = tracemalloc.get_traced_memory()
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            self.sample()
+
+    def sample(self):
+        current, _ = tracemalloc.get_traced_memory()
+        # Snapshots are expensive, so only take one on a meaningful new high
+        if current - self._baseline < self.min_growth:
+            return
+        if self.snapshot is not None and current < self.snapshot_bytes * 1.1:
+            return
+        self.snapshot = tracemalloc.take_snapshot()
+        self.snapshot_bytes = current
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+
+class RequestProfiler:
+    """
+    Opt-in per-request CPU and memory profiling.
+
+    A request is profiled when it carries the admin header with the token from
+    PROFILING_ADMIN_TOKEN, or when it is picked by PROFILING_SAMPLE_RATE
+    (0.0 - 1.0). For each profiled request a cProfile dump, tracemalloc
+    reports (allocations near the peak and allocations still alive at the end)
+    and a JSON summary with peak RSS are written to PROFILING_DIR, named after
+    the request id plus a timestamp and random suffix. Only the newest
+    PROFILING_MAX_PROFILES profiles are kept.
+
+    RSS and tracemalloc figures are process-wide, so with a threaded server
+    they include any requests running concurrently with the profiled one.
+    """
+
+    def __init__(self, app=None):
+        self.admin_token = os.getenv('PROFILING_ADMIN_TOKEN')
+        self.sample_rate = float(os.getenv('PROFILING_SAMPLE_RATE', '0'))
+        self.output_dir = os.getenv('PROFILING_DIR', os.path.join(os.getcwd(), 'profiles'))
+        self.top_allocations = int(os.getenv('PROFILING_TOP_ALLOCATIONS', '25'))
+        self.max_profiles = int(os.getenv('PROFILING_MAX_PROFILES', '200'))
+        self.sample_interval = float(os.getenv('PROFILING_MEMORY_SAMPLE_MS', '50')) / 1000
+        self.min_growth = int(os.getenv('PROFILING_MEMORY_MIN_GROWTH_KB', '1024')) * 1024
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """
+        Register the profiling hooks on a Flask app, covering every blueprint
+
+        Args:
+            app (Flask): The application to instrument
+        """
+        app.before_request(self._start)
+        app.after_request(self._add_request_id)
+        app.teardown_request(self._finish)
+
+    def _is_admin_request(self):
+        token = request.headers.get(PROFILE_HEADER)
+        if not self.admin_token or token is None:
+            return False
+        return hmac.compare_digest(token.encode('utf-8'), self.admin_token.encode('utf-8'))
+
+    def _start(self):
+        request_id = request.headers.get(REQUEST_ID_HEADER, '')
+        g.request_id = request_id if _REQUEST_ID_RE.fullmatch(request_id) else uuid.uuid4().hex
+        g.profiling = None
+        g.profile_status = None
+
+        is_admin = self._is_admin_request()
+        if not is_admin and not (self.sample_rate > 0 and random.random() < self.sample_rate):
+            return
+
+        if not _profile_lock.acquire(blocking=False):
+            if is_admin:
+                print(f"Profiling skipped for request {g.request_id}: another request is being profiled")
+                g.profile_status = 'busy'
+            return
+
+        try:
+            profiler = cProfile.Profile()
+            profiler.enable()
+        except ValueError as e:
+            # Another profiler is already active in this interpreter
+            print(f"Profiling skipped for request {g.request_id}: {e}")
+            _profile_lock.release()
+            if is_admin:
+                g.profile_status = 'unavailable'
+            return
+
+        started_tracemalloc = not tracemalloc.is_tracing()
+        if started_tracemalloc:
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+        sampler = _PeakSampler(self.sample_interval, self.min_growth)
+        sampler.start()
+
+        g.profiling = {
+            "profiler": profiler,
+            "sampler": sampler,
+            "started_tracemalloc": started_tracemalloc,
+            "peak_was_reset": _reset_peak_rss(),
+            "rss_start_kb": _read_proc_status_kb('VmRSS'),
+            "start": time.perf_counter(),
+        }
+        g.profile_status = 'profiled'
+
+    def _add_request_id(self, response):
+        if 'request_id' in g:
+            response.headers[REQUEST_ID_HEADER] = g.request_id
+        if g.get('profile_status'):
+            response.headers[PROFILE_STATUS_HEADER] = g.profile_status
+        return response
+
+    def _finish(self, exc=None):
+        state = g.get('profiling')
+        if not state:
+            return
+        g.profiling = None
+
+        try:
+            state["profiler"].disable()
+            duration = time.perf_counter() - state["start"]
+            state["sampler"].stop()
+            state["sampler"].sample()
+            live_snapshot = tracemalloc.take_snapshot()
+            _, traced_peak = tracemalloc.get_traced_memory()
+            if state["started_tracemalloc"]:
+                tracemalloc.stop()
+
+            self._write(state, live_snapshot, traced_peak, duration, exc)
+            self._prune()
+        except Exception as e:
+            print(f"Error writing profile for request {g.request_id}: {e}")
+        finally:
+            _profile_lock.release()
+
+    def _write_allocations(self, path, snapshot):
+        snapshot = snapshot.filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, threading.__file__),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap*>'),
+        ))
+        top_stats = snapshot.statistics('lineno')[:self.top_allocations]
+        with open(path, 'w', encoding='utf-8') as f:
+            for stat in top_stats:
+                f.write(f"{stat}\n")
+
+    def _write(self, state, live_snapshot, traced_peak, duration, exc):
+        output_dir = os.path.realpath(self.output_dir)
+        os.makedirs(output_dir, exist_ok=True)
+        # Suffix the client-visible id so repeated ids never overwrite a profile
+        name = f"{g.request_id}-{time.strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        base = os.path.realpath(os.path.join(output_dir, name))
+        if os.path.dirname(base) != output_dir:
+            raise ValueError(f"Profile path escapes {output_dir}")
+
+        state["profiler"].dump_stats(base + '.prof')
+
+        sampler = state["sampler"]
+        if sampler.snapshot is not None:
+            self._write_allocations(base + '.peak-allocations.txt', sampler.snapshot)
+        self._write_allocations(base + '.live-allocations.txt', live_snapshot)
+
+        summary = {
+            "request_id": g.request_id,
+            "profile_name": name,
+            "method": request.method,
+            "path": request.path,
+            "endpoint": request.endpoint,
+            "duration_seconds": round(duration, 4),
+            "rss_start_kb": state["rss_start_kb"],
+            "rss_end_kb": _read_proc_status_kb('VmRSS'),
+            "peak_rss_kb": _peak_rss_kb(state["peak_was_reset"]),
+            "peak_rss_scope": "process_since_request_start" if state["peak_was_reset"] else "process_lifetime",
+            "tracemalloc_peak_bytes": traced_peak,
+            "peak_snapshot_bytes": sampler.snapshot_bytes if sampler.snapshot is not None else None,
+            "includes_concurrent_requests": True,
+            "error": str(exc) if exc else None,
+        }
+        with open(base + '.json', 'w', encoding='utf-8') as f:
+            json.dump(summary, f, indent=2)
+
+        print(f"Profile {name} written for request {g.request_id} ({request.path}): "
+              f"{summary['duration_seconds']}s, peak RSS {summary['peak_rss_kb']} KB")
+
+    def _prune(self):
+        """Delete the oldest profiles beyond PROFILING_MAX_PROFILES"""
+        if self.max_profiles <= 0:
+            return
+        output_dir = os.path.realpath(self.output_dir)
+        summaries = [entry for entry in os.scandir(output_dir)
+                     if entry.is_file() and entry.name.endswith('.json')]
+        if len(summaries) <= self.max_profiles:
+            return
+
+        summaries.sort(key=lambda entry: entry.stat().st_mtime)
+        for entry in summaries[:len(summaries) - self.max_profiles]:
+            name = entry.name[:-len('.json')]
+            for suffix in PROFILE_SUFFIXES:
+                try:
+                    os.remove(os.path.join(output_dir, name + suffix))
+                except FileNotFoundError:
+                    pass